@@ -1,7 +1,11 @@
 import streamlit as st
 import os
 import tempfile
-from src.core.invoice_extraction import extract_invoice_data, export_data_to_json, export_data_to_csv
+from src.core.invoice_extraction import (
+    iter_invoice_extraction, export_data_to_json, export_data_to_csv, format_amount,
+    PAGE_RENDERED, PAGE_OCR, HEADER_PARSED, LINE_ITEMS_FOUND, TOTALS_PARSED,
+    EXTRACTION_COMPLETED
+)
 import pandas as pd
 import shutil
 
@@ -69,9 +73,24 @@ if uploaded_file is not None:
         # Save file and get path
         temp_path = save_uploaded_file(uploaded_file)
 
-        # Extract data
-        with st.spinner('Processing invoice...'):
-            data = extract_invoice_data(temp_path)
+        # Extract data, reporting progress as each stage finishes
+        progress_messages = {
+            PAGE_RENDERED: "Page {page} rendered",
+            PAGE_OCR: "Page {page} text extracted",
+            HEADER_PARSED: "Header fields found on page {page}",
+            LINE_ITEMS_FOUND: "Line items found on page {page}",
+            TOTALS_PARSED: "Totals found on page {page}",
+        }
+        data = None
+        with st.status('Processing invoice...') as status:
+            for event in iter_invoice_extraction(temp_path, max_pages=1):
+                if event.type == EXTRACTION_COMPLETED:
+                    data = event.data
+                elif event.type in progress_messages:
+                    status.write(progress_messages[event.type].format(page=event.page))
+                if event.type == HEADER_PARSED and event.data.get('invoice_number'):
+                    status.update(label=f"Processing invoice {event.data['invoice_number']}...")
+            status.update(label='Invoice processed', state='complete')
 
         # Display results in two columns
         col1, col2 = st.columns(2)
@@ -83,7 +102,8 @@ if uploaded_file is not None:
                 ('Date', 'date'),
                 ('Due Date', 'due_date'),
                 ('PO Number', 'po_number'),
-                ('Payment Terms', 'payment_terms')
+                ('Payment Terms', 'payment_terms'),
+                ('Language', 'language')
             ]
             for label, key in fields:
                 if key in data and data[key]:
@@ -106,13 +126,13 @@ if uploaded_file is not None:
         col3, col4, col5 = st.columns(3)
         with col3:
             if data.get('subtotal'):
-                st.metric("Subtotal", f"${data['subtotal']}")
+                st.metric("Subtotal", format_amount(data['subtotal'], data.get('language')))
         with col4:
             if data.get('tax'):
-                st.metric("Tax", f"${data['tax']}")
+                st.metric("Tax", format_amount(data['tax'], data.get('language')))
         with col5:
             if data.get('total'):
-                st.metric("Total", f"${data['total']}")
+                st.metric("Total", format_amount(data['total'], data.get('language')))
 
         # Export buttons
         st.subheader("Export Data")
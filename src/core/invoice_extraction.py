@@ -1,5 +1,5 @@
 import pytesseract
-from PIL import Image
+from PIL import Image, ImageOps
 import cv2
 import re
 import numpy as np
@@ -11,6 +11,9 @@ from pdf2image import convert_from_path, pdfinfo_from_path
 import io
 import tempfile
 import logging
+import subprocess
+import unicodedata
+from collections import namedtuple
 
 # Configuración de la ruta de Tesseract (ajústala según tu sistema)
 pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
@@ -22,8 +25,111 @@ os.environ['TESSDATA_PREFIX'] = r'C:\Program Files\Tesseract-OCR\tessdata'
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Possible poppler install locations, tried in order
+POPPLER_PATHS = [
+    None,  # Try system's poppler first
+    r"C:\Program Files\poppler\Library\bin",
+    r"C:\Program Files\poppler-23.11.0\Library\bin",
+    r"C:\poppler\bin",
+    os.getenv('POPPLER_PATH')
+]
+
+# Default Tesseract model used when no language can be detected
+DEFAULT_LANGUAGE = 'eng'
+
+# Scale factor applied to the page for the quick language-detection OCR pass
+LANGUAGE_DETECTION_SCALE = 0.5
+
+# Event emitted by iter_invoice_extraction as each pipeline stage finishes.
+# The data payload depends on the event type:
+#   PAGE_RENDERED         PIL.Image.Image of the page (RGB)
+#   PAGE_OCR              str with the OCR text of the page
+#   HEADER_PARSED         dict with the HEADER_FIELDS found so far
+#   LINE_ITEMS_FOUND      list of item dicts found on the page
+#   TOTALS_PARSED         dict with the TOTAL_FIELDS found so far
+#   EXTRACTION_COMPLETED  dict as returned by extract_invoice_data
+ExtractionEvent = namedtuple('ExtractionEvent', ['type', 'page', 'data'])
+
+# Extraction event types
+PAGE_RENDERED = 'page_rendered'
+PAGE_OCR = 'page_ocr'
+HEADER_PARSED = 'header_parsed'
+LINE_ITEMS_FOUND = 'line_items_found'
+TOTALS_PARSED = 'totals_parsed'
+EXTRACTION_COMPLETED = 'extraction_completed'
+
+# Invoice fields grouped by the stage that produces them
+HEADER_FIELDS = ['invoice_number', 'date', 'due_date', 'po_number', 'payment_terms',
+                 'bill_to', 'send_to', 'notes']
+TOTAL_FIELDS = ['subtotal', 'tax', 'total']
+
+# Locale-aware extraction rules, keyed by Tesseract traineddata name
+LOCALE_RULES = {
+    'eng': {
+        'keywords': {
+            'invoice', 'date', 'due', 'bill', 'to', 'send', 'ship', 'total',
+            'subtotal', 'tax', 'amount', 'quantity', 'qty', 'price',
+            'description', 'payment', 'terms', 'notes', 'the', 'and', 'of',
+            'for', 'order', 'purchase',
+        },
+        'invoice_patterns': [
+            r'Invoice\s*(?:No\.?|Number|#)?\s*:?\s*([A-Z0-9-]+)',
+            r'(?:No\.?|Number|#)\s*:?\s*([A-Z0-9-]+)',
+            r'(?<=INVOICE\s)([A-Z0-9-]+)',
+        ],
+        'date': r'(?:Issue|Invoice)\s*Date[:.]?\s*(\d{4}[-/]\d{2}[-/]\d{2})',
+        'due_date': r'(?:Due|Expiration)\s*Date[:.]?\s*(\d{4}[-/]\d{2}[-/]\d{2})',
+        'po_number': r'(?:Purchase\s*Order|PO)[:.]?\s*([A-Z0-9-]+)',
+        'payment_terms': r'Payment\s*Terms[:.]?\s*([^\n]+)',
+        'bill_to': r'Bill\s*To[:.]?\s*([^\n]+(?:\n[^\n]+)*)',
+        'send_to': r'Send\s*To[:.]?\s*([^\n]+(?:\n[^\n]+)*)',
+        'amount_patterns': {
+            'total': r'\bTotal[:.]?\s*\$?\s*([\d,]+\.?\d{0,2})',
+            'subtotal': r'Subtotal[:.]?\s*\$?\s*([\d,]+\.?\d{0,2})',
+            'tax': r'Tax[:.]?\s*\$?\s*([\d,]+\.?\d{0,2})'
+        },
+        'item_pattern': r'^(.*?)\s+(\d+)\s+\$?([\d,.]+)\s+\$?([\d,.]+)',
+        'item_exclude': ['total', 'subtotal', 'tax'],
+        'notes': r'Notes?[:.]?\s*([^\n]+)',
+        'decimal_comma': False,
+        'day_first': False,
+        'currency_format': '${}'
+    },
+    'spa': {
+        'keywords': {
+            'factura', 'fecha', 'vencimiento', 'cliente', 'facturar',
+            'enviar', 'total', 'subtotal', 'iva', 'impuesto', 'importe',
+            'cantidad', 'precio', 'descripcion', 'forma', 'pago',
+            'condiciones', 'notas', 'observaciones', 'base', 'imponible',
+            'pedido', 'de', 'la', 'el', 'y', 'del', 'para', 'por', 'con',
+        },
+        'invoice_patterns': [
+            r'Factura\s*(?:N[ºo°]\.?|N[uú]mero|Num\.?|#)?\s*:?\s*([A-Z0-9-]*\d[A-Z0-9-]*)',
+            r'(?:N[ºo°]\.?|N[uú]mero|#)\s*(?:de\s*factura)?\s*:?\s*([A-Z0-9-]*\d[A-Z0-9-]*)',
+            r'(?<=FACTURA\s)([A-Z0-9-]*\d[A-Z0-9-]*)',
+        ],
+        'date': r'Fecha(?:\s*de\s*(?:emisi[oó]n|factura))?[:.]?\s*(\d{2}[-/]\d{2}[-/]\d{4}|\d{4}[-/]\d{2}[-/]\d{2})',
+        'due_date': r'(?:Fecha\s*de\s*)?Vencimiento[:.]?\s*(\d{2}[-/]\d{2}[-/]\d{4}|\d{4}[-/]\d{2}[-/]\d{2})',
+        'po_number': r'(?:Orden\s*de\s*compra|N[ºo°]\.?\s*de\s*pedido|\bPedido\b)[:.]?\s*([A-Z0-9-]+)',
+        'payment_terms': r'(?:Forma|Condiciones|T[eé]rminos)\s*de\s*pago[:.]?\s*([^\n]+)',
+        'bill_to': r'(?:Facturar\s*a|\bCliente\b)[:.]?\s*([^\n]+(?:\n[^\n]+)*)',
+        'send_to': r'Enviar\s*a[:.]?\s*([^\n]+(?:\n[^\n]+)*)',
+        'amount_patterns': {
+            'total': r'\bTotal(?:\s*factura)?[:.]?\s*(?:€|EUR)?\s*([\d.,]*\d)',
+            'subtotal': r'(?:Subtotal|Base\s*imponible)[:.]?\s*(?:€|EUR)?\s*([\d.,]*\d)',
+            'tax': r'\b(?:IVA|Impuestos?)\b[:.]?(?:\s*\(?\d{1,2}(?:[.,]\d+)?\s*%\)?)?[:.]?\s*(?:€|EUR)?\s*([\d.,]*\d)(?![\d.,]*\s*%)'
+        },
+        'item_pattern': r'^(.*?)\s+(\d+)\s+(?:€\s*)?([\d.,]+)\s*€?\s+(?:€\s*)?([\d.,]+)\s*€?',
+        'item_exclude': ['total', 'subtotal', 'iva', 'impuesto', 'base imponible'],
+        'notes': r'(?:Notas?|Observaciones)[:.]?\s*([^\n]+)',
+        'decimal_comma': True,
+        'day_first': True,
+        'currency_format': '{} €'
+    }
+}
+
 def verify_pdf(pdf_path):
-    """Verifies if a PDF file is valid and readable"""
+    """Verifies if a PDF file is valid and readable, returning its pdfinfo data"""
     try:
         # Check if file is empty
         if os.path.getsize(pdf_path) == 0:
@@ -37,27 +143,22 @@ def verify_pdf(pdf_path):
         except Exception as e:
             raise ValueError(f"Invalid PDF format: {str(e)}")
             
-        return True
+        return pdf_info
     except Exception as e:
         raise ValueError(f"PDF verification failed: {str(e)}")
 
-def convert_pdf_to_images(pdf_path):
-    """Converts a PDF to a list of images with enhanced error handling"""
+def convert_pdf_to_images(pdf_path, first_page=None, last_page=None, verify=True):
+    """Converts a PDF (or a page range of it) to a list of images with enhanced error handling
+
+    Pass verify=False when the PDF has already been checked with verify_pdf.
+    """
     try:
         # Verify PDF first
-        verify_pdf(pdf_path)
-        
-        # Define possible poppler paths
-        poppler_paths = [
-            None,  # Try system's poppler first
-            r"C:\Program Files\poppler\Library\bin",
-            r"C:\Program Files\poppler-23.11.0\Library\bin",
-            r"C:\poppler\bin",
-            os.getenv('POPPLER_PATH')
-        ]
+        if verify:
+            verify_pdf(pdf_path)
         
         # Remove None and empty values
-        poppler_paths = [p for p in poppler_paths if p]
+        poppler_paths = [p for p in POPPLER_PATHS if p]
         
         last_error = None
         # Try each poppler path
@@ -73,6 +174,11 @@ def convert_pdf_to_images(pdf_path):
                 if poppler_path:
                     conversion_args['poppler_path'] = poppler_path
                 
+                if first_page:
+                    conversion_args['first_page'] = first_page
+                if last_page:
+                    conversion_args['last_page'] = last_page
+                
                 images = convert_from_path(**conversion_args)
                 
                 if not images:
@@ -137,123 +243,340 @@ def preprocess_image(image):
     except Exception as e:
         raise ValueError(f"Error preprocessing image: {str(e)}")
 
-def extract_invoice_data(file_path):
-    """Extracts data from an invoice"""
-    logger.info(f"Starting invoice data extraction from: {file_path}")
+def strip_accents(text):
+    """Removes diacritics so keyword matching is robust to OCR accent errors"""
+    normalized = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in normalized if not unicodedata.combining(c))
+
+def detect_language(text):
+    """Detects the most likely invoice language from a text sample"""
+    if not text or not text.strip():
+        return DEFAULT_LANGUAGE
     
-    try:
-        # Verify file path and basic file properties
-        verify_file_path(file_path)
-        
-        # Process PDF or image
-        if file_path.lower().endswith('.pdf'):
-            logger.info("Processing PDF file")
-            images = convert_pdf_to_images(file_path)
-            if not images:
-                raise ValueError("No images extracted from PDF")
-            image = images[0]
-            processed_img = preprocess_image(image)
-        else:
-            logger.info("Processing image file")
-            processed_img = preprocess_image(file_path)
+    words = re.findall(r'[a-z]+', strip_accents(text).lower())
+    if not words:
+        return DEFAULT_LANGUAGE
+    
+    # Score each language by how many words belong to its keyword set
+    scores = {
+        lang: sum(1 for word in words if word in rules['keywords'])
+        for lang, rules in LOCALE_RULES.items()
+    }
+    
+    best_lang = max(scores, key=scores.get)
+    if scores[best_lang] <= scores[DEFAULT_LANGUAGE]:
+        return DEFAULT_LANGUAGE
+    
+    return best_lang
+
+def extract_pdf_text_layer(pdf_path):
+    """Extracts the embedded text layer of the first PDF page, if any"""
+    for poppler_path in POPPLER_PATHS:
+        command = os.path.join(poppler_path, 'pdftotext') if poppler_path else 'pdftotext'
+        try:
+            result = subprocess.run(
+                [command, '-f', '1', '-l', '1', '-enc', 'UTF-8', pdf_path, '-'],
+                capture_output=True, timeout=30
+            )
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.debug(f"pdftotext not available at {poppler_path}: {str(e)}")
+            continue
+        
+        if result.returncode == 0:
+            return result.stdout.decode('utf-8', errors='ignore')
+    
+    return ''
+
+# Installed Tesseract models, filled on the first successful lookup
+_available_languages = None
+
+def get_available_languages():
+    """Returns the set of Tesseract traineddata models installed (cached per process)"""
+    global _available_languages
+    if _available_languages is None:
+        try:
+            _available_languages = frozenset(pytesseract.get_languages(config=''))
+        except Exception as e:
+            logger.warning(f"Could not list Tesseract languages: {str(e)}")
+            return frozenset()
+    
+    return _available_languages
+
+def select_ocr_language(processed_img, text_layer=None):
+    """Picks the single Tesseract model to use for a document"""
+    sample = text_layer or ''
+    
+    # Fall back to a fast low-resolution OCR pass when there is no text layer
+    if not sample.strip():
+        try:
+            height, width = processed_img.shape[:2]
+            small_img = cv2.resize(
+                processed_img,
+                (int(width * LANGUAGE_DETECTION_SCALE), int(height * LANGUAGE_DETECTION_SCALE)),
+                interpolation=cv2.INTER_AREA
+            )
+            sample = pytesseract.image_to_string(
+                small_img, config=f'--oem 3 --psm 6 -l {DEFAULT_LANGUAGE}'
+            )
+        except Exception as e:
+            logger.warning(f"Language detection OCR pass failed: {str(e)}")
+            return DEFAULT_LANGUAGE
+    
+    lang = detect_language(sample)
+    
+    available = get_available_languages()
+    if available and lang not in available:
+        logger.warning(f"Tesseract model '{lang}' not installed, falling back to '{DEFAULT_LANGUAGE}'")
+        return DEFAULT_LANGUAGE
+    
+    return lang
+
+def parse_amount(value, decimal_comma=False):
+    """Normalizes an amount string to use a dot as decimal separator
+
+    The last '.' or ',' followed by one or two digits is the decimal mark and
+    the other character the thousands separator. decimal_comma only breaks
+    ties for ambiguous values such as '1.234'.
+    """
+    value = value.strip()
+    last_sep = max(value.rfind('.'), value.rfind(','))
+    if last_sep == -1:
+        return value
+    
+    sep = value[last_sep]
+    other = ',' if sep == '.' else '.'
+    decimals = value[last_sep + 1:]
+    
+    if other in value or 1 <= len(decimals) <= 2:
+        decimal_mark = sep
+    elif value.count(sep) > 1:
+        decimal_mark = other
+    else:
+        decimal_mark = ',' if decimal_comma else '.'
+    
+    thousands_mark = ',' if decimal_mark == '.' else '.'
+    return value.replace(thousands_mark, '').replace(decimal_mark, '.')
+
+def normalize_date(value, day_first=False):
+    """Converts a yyyy-mm-dd or (day_first) dd/mm/yyyy date to ISO yyyy-mm-dd"""
+    parts = re.split(r'[-/]', value.strip())
+    if len(parts) != 3:
+        return value
+    
+    if len(parts[0]) == 4:
+        year, month, day = parts
+    elif day_first:
+        day, month, year = parts
+    else:
+        month, day, year = parts
+    
+    return f"{year}-{month}-{day}"
+
+def format_amount(value, lang=DEFAULT_LANGUAGE):
+    """Formats an amount with the currency symbol used for a language"""
+    return get_locale_rules(lang)['currency_format'].format(value)
+
+def get_locale_rules(lang):
+    """Returns the extraction rules for a language, defaulting to English"""
+    return LOCALE_RULES.get(lang, LOCALE_RULES[DEFAULT_LANGUAGE])
+
+def parse_header_fields(text, lang=DEFAULT_LANGUAGE):
+    """Parses header fields (number, dates, PO, terms, addresses, notes) from OCR text"""
+    rules = get_locale_rules(lang)
+    header = {field: None for field in HEADER_FIELDS}
+    
+    # Extract invoice number
+    for pattern in rules['invoice_patterns']:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            header['invoice_number'] = match.group(1).strip()
+            break
+    
+    # Extract dates
+    date_match = re.search(rules['date'], text, re.IGNORECASE)
+    if date_match:
+        header['date'] = normalize_date(date_match.group(1), rules['day_first'])
+    
+    due_date_match = re.search(rules['due_date'], text, re.IGNORECASE)
+    if due_date_match:
+        header['due_date'] = normalize_date(due_date_match.group(1), rules['day_first'])
+    
+    # Extract PO number
+    po_match = re.search(rules['po_number'], text, re.IGNORECASE)
+    if po_match:
+        header['po_number'] = po_match.group(1)
+    
+    # Extract payment terms
+    payment_terms_match = re.search(rules['payment_terms'], text, re.IGNORECASE)
+    if payment_terms_match:
+        header['payment_terms'] = payment_terms_match.group(1).strip()
+    
+    # Extract addresses
+    bill_to_match = re.search(rules['bill_to'], text, re.IGNORECASE)
+    if bill_to_match:
+        header['bill_to'] = clean_address(bill_to_match.group(1))
+    
+    send_to_match = re.search(rules['send_to'], text, re.IGNORECASE)
+    if send_to_match:
+        header['send_to'] = clean_address(send_to_match.group(1))
+    
+    # Extract notes
+    notes_match = re.search(rules['notes'], text, re.IGNORECASE)
+    if notes_match:
+        header['notes'] = notes_match.group(1).strip()
+    
+    return header
+
+def parse_line_items(text, lang=DEFAULT_LANGUAGE):
+    """Parses line items from OCR text, one candidate per line"""
+    rules = get_locale_rules(lang)
+    decimal_comma = rules['decimal_comma']
+    item_pattern = re.compile(rules['item_pattern'])
+    items = []
+    
+    for line in text.split('\n'):
+        match = item_pattern.match(line.strip())
+        if match and not any(re.search(rf'\b{keyword}\b', match.group(1).lower()) for keyword in rules['item_exclude']):
+            try:
+                item = {
+                    'description': match.group(1).strip(),
+                    'quantity': int(match.group(2)),
+                    'unit_price': float(parse_amount(match.group(3), decimal_comma)),
+                    'total': float(parse_amount(match.group(4), decimal_comma))
+                }
+            except ValueError:
+                continue
+            items.append(item)
+    
+    return items
+
+def parse_totals(text, lang=DEFAULT_LANGUAGE):
+    """Parses subtotal, tax and total amounts from OCR text"""
+    rules = get_locale_rules(lang)
+    totals = {field: None for field in TOTAL_FIELDS}
+    
+    for key, pattern in rules['amount_patterns'].items():
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            totals[key] = parse_amount(match.group(1), rules['decimal_comma'])
+    
+    return totals
+
+def parse_invoice_text(text, lang=DEFAULT_LANGUAGE):
+    """Parses OCR text into invoice fields using the rules for a language"""
+    extracted_data = {'items': parse_line_items(text, lang)}
+    extracted_data.update(parse_header_fields(text, lang))
+    extracted_data.update(parse_totals(text, lang))
+    extracted_data['language'] = lang
+    
+    return extracted_data
+
+def iter_invoice_pages(file_path, max_pages=None):
+    """Yields (page_number, PIL image) one page at a time
+
+    PDF pages are rendered lazily so the first page is available before the
+    rest of the document is converted. Image files are yielded as page 1.
+    """
+    if not file_path.lower().endswith('.pdf'):
+        logger.info("Processing image file")
+        try:
+            with Image.open(file_path) as img:
+                # Apply EXIF orientation so phone photos are not OCR'd sideways
+                image = ImageOps.exif_transpose(img).convert('RGB')
+        except Exception as e:
+            raise ValueError(f"Could not open image: {str(e)}")
+        yield 1, image
+        return
+    
+    logger.info("Processing PDF file")
+    page_count = verify_pdf(file_path)['Pages']
+    if max_pages:
+        page_count = min(page_count, max_pages)
+    
+    for page_number in range(1, page_count + 1):
+        images = convert_pdf_to_images(file_path, first_page=page_number,
+                                       last_page=page_number, verify=False)
+        if not images:
+            raise ValueError(f"No image extracted from PDF page {page_number}")
+        yield page_number, images[0]
+
+def iter_invoice_extraction(file_path, lang=None, max_pages=None):
+    """Extracts data from an invoice, yielding an ExtractionEvent per stage
+
+    Events are emitted in pipeline order: PAGE_RENDERED and PAGE_OCR for
+    each page, then HEADER_PARSED, LINE_ITEMS_FOUND and TOTALS_PARSED
+    whenever a page adds new information, and a final EXTRACTION_COMPLETED
+    carrying the same dict extract_invoice_data returns. Consumers may stop
+    iterating at any point; pages not yet reached are never rendered.
+    """
+    logger.info(f"Starting streaming invoice data extraction from: {file_path}")
+    
+    # Verify file path and basic file properties
+    verify_file_path(file_path)
+    
+    page_texts = []
+    header = {}
+    totals = {}
+    
+    for page_number, image in iter_invoice_pages(file_path, max_pages):
+        yield ExtractionEvent(PAGE_RENDERED, page_number, image)
+        
+        processed_img = preprocess_image(image)
+        
+        # Pick a single OCR model for the document from its first page
+        if lang is None:
+            text_layer = None
+            if file_path.lower().endswith('.pdf'):
+                text_layer = extract_pdf_text_layer(file_path)
+            lang = select_ocr_language(processed_img, text_layer)
+            logger.info(f"Using Tesseract language model: {lang}")
         
         # Extract text using Tesseract
         try:
-            custom_config = r'--oem 3 --psm 6 -l eng'
-            text = pytesseract.image_to_string(processed_img, config=custom_config)
+            custom_config = f'--oem 3 --psm 6 -l {lang}'
+            page_text = pytesseract.image_to_string(processed_img, config=custom_config)
         except Exception as e:
             raise RuntimeError(f"Tesseract OCR error: {str(e)}")
         
-        # Initialize extracted data
-        extracted_data = {
-            'items': [],
-            'invoice_number': None,
-            'date': None,
-            'due_date': None,
-            'po_number': None,
-            'payment_terms': None,
-            'bill_to': None,
-            'send_to': None,
-            'total': None,
-            'subtotal': None,
-            'tax': None,
-            'notes': None
-        }
-        
-        # Extract invoice number
-        invoice_patterns = [
-            r'Invoice\s*(?:No\.?|Number|#)?\s*:?\s*([A-Z0-9-]+)',
-            r'(?:No\.?|Number|#)\s*:?\s*([A-Z0-9-]+)',
-            r'(?<=INVOICE\s)([A-Z0-9-]+)',
-        ]
-        
-        for pattern in invoice_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                extracted_data['invoice_number'] = match.group(1).strip()
-                break
-        
-        # Extract dates
-        date_match = re.search(r'(?:Issue|Invoice)\s*Date[:.]?\s*(\d{4}[-/]\d{2}[-/]\d{2})', text, re.IGNORECASE)
-        if date_match:
-            extracted_data['date'] = date_match.group(1)
-        
-        due_date_match = re.search(r'(?:Due|Expiration)\s*Date[:.]?\s*(\d{4}[-/]\d{2}[-/]\d{2})', text, re.IGNORECASE)
-        if due_date_match:
-            extracted_data['due_date'] = due_date_match.group(1)
-        
-        # Extract PO number
-        po_match = re.search(r'(?:Purchase\s*Order|PO)[:.]?\s*([A-Z0-9-]+)', text, re.IGNORECASE)
-        if po_match:
-            extracted_data['po_number'] = po_match.group(1)
-        
-        # Extract payment terms
-        payment_terms_match = re.search(r'Payment\s*Terms[:.]?\s*([^\n]+)', text, re.IGNORECASE)
-        if payment_terms_match:
-            extracted_data['payment_terms'] = payment_terms_match.group(1).strip()
-        
-        # Extract addresses
-        bill_to_match = re.search(r'Bill\s*To[:.]?\s*([^\n]+(?:\n[^\n]+)*)', text, re.IGNORECASE)
-        if bill_to_match:
-            extracted_data['bill_to'] = clean_address(bill_to_match.group(1))
-        
-        send_to_match = re.search(r'Send\s*To[:.]?\s*([^\n]+(?:\n[^\n]+)*)', text, re.IGNORECASE)
-        if send_to_match:
-            extracted_data['send_to'] = clean_address(send_to_match.group(1))
-        
-        # Extract amounts
-        amount_patterns = {
-            'total': r'Total[:.]?\s*\$?\s*([\d,]+\.?\d{0,2})',
-            'subtotal': r'Subtotal[:.]?\s*\$?\s*([\d,]+\.?\d{0,2})',
-            'tax': r'Tax[:.]?\s*\$?\s*([\d,]+\.?\d{0,2})'
-        }
+        page_texts.append(page_text)
+        yield ExtractionEvent(PAGE_OCR, page_number, page_text)
         
-        for key, pattern in amount_patterns.items():
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                extracted_data[key] = match.group(1).replace(',', '')
+        # Header fields and totals may span pages, so parse the text seen so far
+        text = '\n'.join(page_texts)
         
-        # Extract items
-        lines = text.split('\n')
-        item_pattern = re.compile(r'^(.*?)\s+(\d+)\s+\$?([\d,.]+)\s+\$?([\d,.]+)')
+        new_header = parse_header_fields(text, lang)
+        if new_header != header and any(new_header.values()):
+            header = new_header
+            yield ExtractionEvent(HEADER_PARSED, page_number, dict(header))
         
-        for line in lines:
-            match = item_pattern.match(line.strip())
-            if match and not any(keyword in match.group(1).lower() for keyword in ['total', 'subtotal', 'tax']):
-                item = {
-                    'description': match.group(1).strip(),
-                    'quantity': int(match.group(2)),
-                    'unit_price': float(match.group(3).replace(',', '')),
-                    'total': float(match.group(4).replace(',', ''))
-                }
-                extracted_data['items'].append(item)
+        items = parse_line_items(page_text, lang)
+        if items:
+            yield ExtractionEvent(LINE_ITEMS_FOUND, page_number, items)
         
-        # Extract notes
-        notes_match = re.search(r'Notes?[:.]?\s*([^\n]+)', text, re.IGNORECASE)
-        if notes_match:
-            extracted_data['notes'] = notes_match.group(1).strip()
+        new_totals = parse_totals(text, lang)
+        if new_totals != totals and any(new_totals.values()):
+            totals = new_totals
+            yield ExtractionEvent(TOTALS_PARSED, page_number, dict(totals))
+    
+    extracted_data = parse_invoice_text('\n'.join(page_texts), lang or DEFAULT_LANGUAGE)
+    yield ExtractionEvent(EXTRACTION_COMPLETED, len(page_texts), extracted_data)
+
+def extract_invoice_data(file_path, lang=None):
+    """Extracts data from an invoice
+    
+    If lang is None the Tesseract model is chosen per document with
+    detect_language; pass a traineddata name (e.g. 'spa') to force one.
+    Only the first page is processed; use iter_invoice_extraction for
+    multi-page documents or incremental results.
+    """
+    logger.info(f"Starting invoice data extraction from: {file_path}")
+    
+    try:
+        for event in iter_invoice_extraction(file_path, lang=lang, max_pages=1):
+            if event.type == EXTRACTION_COMPLETED:
+                return event.data
         
-        return extracted_data
+        raise ValueError("Extraction finished without producing data")
         
     except Exception as e:
         logger.error(f"Error in invoice data extraction: {str(e)}")
@@ -269,10 +592,10 @@ def clean_address(address_text):
     cleaned = re.sub(r'[`~]', '', cleaned)
     
     # Remove address prefixes
-    cleaned = re.sub(r'^(?:Bill\s+To|Send\s+To|Ship\s+To)[:.]?\s*', '', cleaned, flags=re.IGNORECASE)
+    cleaned = re.sub(r'^(?:Bill\s+To|Send\s+To|Ship\s+To|Facturar\s+a|Enviar\s+a|Cliente)[:.]?\s*', '', cleaned, flags=re.IGNORECASE)
     
     # Remove text after keywords that might indicate the end of the address
-    cleaned = re.split(r'\b(?:Invoice|Date|P\.O\.|Total)\b', cleaned)[0].strip()
+    cleaned = re.split(r'\b(?:Invoice|Date|P\.O\.|Total|Factura|Fecha|Forma\s+de\s+pago|Descripci[oó]n)\b', cleaned)[0].strip()
     
     return cleaned
 
@@ -0,0 +1,278 @@
+import pytest
+from PIL import Image
+
+from src.core import invoice_extraction
+from src.core.invoice_extraction import (
+    detect_language, parse_amount, parse_header_fields, parse_line_items,
+    parse_totals, parse_invoice_text, normalize_date, format_amount,
+    get_available_languages, iter_invoice_extraction, extract_invoice_data,
+    PAGE_RENDERED, PAGE_OCR, HEADER_PARSED, LINE_ITEMS_FOUND, TOTALS_PARSED,
+    EXTRACTION_COMPLETED
+)
+
+ENGLISH_TEXT = """Invoice No: INV-2024-001
+Invoice Date: 2024-03-15
+Due Date: 2024-04-15
+PO: PO-778
+Payment Terms: Net 30
+Bill To: Acme Corp
+123 Main Street
+Description Quantity Price Amount
+Consulting services 2 $1,250.50 $2,501.00
+Subtotal: $2,501.00
+Tax: $250.10
+Total: $2,751.10
+Notes: Thank you for your business"""
+
+SPANISH_TEXT = """FACTURA
+Factura Nº: F-2024-001
+Fecha: 15/03/2024
+Fecha de vencimiento: 15/04/2024
+Pedido: P-42
+Facturar a: Empresa S.L.
+Calle Mayor 1, Madrid
+Forma de pago: Transferencia
+Descripción Cantidad Precio Importe
+Servicio de consultoría 2 1.250,50 2.501,00
+Base imponible: 2.501,00 €
+IVA (21%): 525,21 €
+Total: 3.026,21 €
+Observaciones: Gracias por su compra"""
+
+
+def test_detect_language_english():
+    assert detect_language(ENGLISH_TEXT) == 'eng'
+
+
+def test_detect_language_spanish():
+    assert detect_language(SPANISH_TEXT) == 'spa'
+
+
+def test_detect_language_defaults_to_english_without_text():
+    assert detect_language('') == 'eng'
+    assert detect_language('12345 --- 678') == 'eng'
+
+
+@pytest.mark.parametrize('value, decimal_comma, expected', [
+    ('1234.56', True, '1234.56'),
+    ('1234,56', False, '1234.56'),
+    ('1.234,56', True, '1234.56'),
+    ('1,234.56', False, '1234.56'),
+    ('1.234,56', False, '1234.56'),
+    ('150.00', True, '150.00'),
+    ('1.234', True, '1234'),
+    ('1,234', False, '1234'),
+    ('1.234.567', False, '1234567'),
+    ('300', True, '300'),
+])
+def test_parse_amount(value, decimal_comma, expected):
+    assert parse_amount(value, decimal_comma) == expected
+
+
+def test_parse_header_fields_english():
+    header = parse_header_fields(ENGLISH_TEXT, 'eng')
+    assert header['invoice_number'] == 'INV-2024-001'
+    assert header['date'] == '2024-03-15'
+    assert header['due_date'] == '2024-04-15'
+    assert header['payment_terms'] == 'Net 30'
+    assert header['notes'] == 'Thank you for your business'
+
+
+def test_parse_header_fields_spanish():
+    header = parse_header_fields(SPANISH_TEXT, 'spa')
+    assert header['invoice_number'] == 'F-2024-001'
+    assert header['date'] == '2024-03-15'
+    assert header['due_date'] == '2024-04-15'
+    assert header['po_number'] == 'P-42'
+    assert header['payment_terms'] == 'Transferencia'
+    assert header['bill_to'] == 'Empresa S.L. Calle Mayor 1, Madrid'
+    assert header['notes'] == 'Gracias por su compra'
+
+
+def test_parse_line_items_english():
+    items = parse_line_items(ENGLISH_TEXT, 'eng')
+    assert items == [{'description': 'Consulting services', 'quantity': 2,
+                      'unit_price': 1250.5, 'total': 2501.0}]
+
+
+def test_parse_line_items_spanish_decimal_comma():
+    items = parse_line_items(SPANISH_TEXT, 'spa')
+    assert items == [{'description': 'Servicio de consultoría', 'quantity': 2,
+                      'unit_price': 1250.5, 'total': 2501.0}]
+
+
+def test_parse_line_items_keeps_words_containing_excluded_keywords():
+    items = parse_line_items('Licencia definitiva 2 150,00 300,00', 'spa')
+    assert [item['description'] for item in items] == ['Licencia definitiva']
+
+
+def test_parse_line_items_spanish_decimal_dot():
+    items = parse_line_items('Servicio de soporte 2 150.00 300.00', 'spa')
+    assert items == [{'description': 'Servicio de soporte', 'quantity': 2,
+                      'unit_price': 150.0, 'total': 300.0}]
+
+
+def test_parse_totals_english():
+    totals = parse_totals(ENGLISH_TEXT, 'eng')
+    assert totals['subtotal'] == '2501.00'
+    assert totals['tax'] == '250.10'
+    assert totals['total'] == '2751.10'
+
+
+def test_parse_totals_spanish_decimal_comma():
+    assert parse_totals(SPANISH_TEXT, 'spa') == {
+        'subtotal': '2501.00', 'tax': '525.21', 'total': '3026.21'
+    }
+
+
+def test_parse_totals_spanish_decimal_dot():
+    text = "Base imponible: 300.00\nIVA (21%): 63.00\nTotal: 363.00"
+    assert parse_totals(text, 'spa') == {
+        'subtotal': '300.00', 'tax': '63.00', 'total': '363.00'
+    }
+
+
+@pytest.mark.parametrize('line, expected', [
+    ('IVA (21%): 525,21 €', '525.21'),
+    ('IVA 21%: 63.00', '63.00'),
+    ('IVA: 21% 63.00', '63.00'),
+    ('IVA: 21%  210,00', '210.00'),
+    ('IVA: 525,21', '525.21'),
+    ('Factura Nº: F-1\nLicencia definitiva 2 150,00 300,00\nBase imponible: 300,00\n'
+     'IVA (21%): 63,00\nTotal: 363,00', '63.00'),
+])
+def test_parse_totals_spanish_tax_layouts(line, expected):
+    assert parse_totals(line, 'spa')['tax'] == expected
+
+
+def test_parse_totals_spanish_tax_rate_without_amount():
+    assert parse_totals('IVA: 21%', 'spa')['tax'] is None
+
+
+@pytest.mark.parametrize('value, day_first, expected', [
+    ('15/03/2024', True, '2024-03-15'),
+    ('15-03-2024', True, '2024-03-15'),
+    ('2024/03/15', True, '2024-03-15'),
+    ('2024-03-15', False, '2024-03-15'),
+    ('03/15/2024', False, '2024-03-15'),
+])
+def test_normalize_date(value, day_first, expected):
+    assert normalize_date(value, day_first) == expected
+
+
+def test_format_amount_uses_language_currency():
+    assert format_amount('3026.21', 'eng') == '$3026.21'
+    assert format_amount('3026.21', 'spa') == '3026.21 €'
+    assert format_amount('3026.21', None) == '$3026.21'
+
+
+def test_get_available_languages_only_caches_success(monkeypatch):
+    calls = []
+
+    def fake_get_languages(config=''):
+        calls.append(config)
+        if len(calls) == 1:
+            raise RuntimeError('tesseract not found')
+        return ['eng', 'spa']
+
+    monkeypatch.setattr(invoice_extraction, '_available_languages', None)
+    monkeypatch.setattr(invoice_extraction.pytesseract, 'get_languages', fake_get_languages)
+
+    assert get_available_languages() == frozenset()
+    assert get_available_languages() == frozenset({'eng', 'spa'})
+    assert get_available_languages() == frozenset({'eng', 'spa'})
+    assert len(calls) == 2
+
+
+def test_parse_invoice_text_sets_language():
+    data = parse_invoice_text(SPANISH_TEXT, 'spa')
+    assert data['language'] == 'spa'
+    assert data['total'] == '3026.21'
+    assert len(data['items']) == 1
+
+
+PDF_PAGES = [
+    "Invoice No: INV-9\nInvoice Date: 2024-01-01\nItem A 2 $10.00 $20.00",
+    "Item B 1 $5.00 $5.00",
+    "Tax: $2.50\nTotal: $27.50",
+]
+
+
+@pytest.fixture
+def fake_pdf(tmp_path, monkeypatch):
+    """Fakes a three page PDF, recording which pages get rendered"""
+    pdf_path = tmp_path / 'invoice.pdf'
+    pdf_path.write_bytes(b'%PDF-fake')
+    rendered = []
+
+    def fake_convert(path, first_page=None, last_page=None, verify=True):
+        rendered.append(first_page)
+        # Encode the page number in the image width so OCR can be faked per page
+        return [Image.new('RGB', (100 * first_page, 50), 'white')]
+
+    def fake_ocr(image, config=''):
+        return PDF_PAGES[image.shape[1] // 100 - 1]
+
+    monkeypatch.setattr(invoice_extraction, 'verify_pdf', lambda path: {'Pages': len(PDF_PAGES)})
+    monkeypatch.setattr(invoice_extraction, 'convert_pdf_to_images', fake_convert)
+    monkeypatch.setattr(invoice_extraction, 'select_ocr_language', lambda img, text_layer=None: 'eng')
+    monkeypatch.setattr(invoice_extraction, 'extract_pdf_text_layer', lambda path: '')
+    monkeypatch.setattr(invoice_extraction.pytesseract, 'image_to_string', fake_ocr)
+    return str(pdf_path), rendered
+
+
+def test_iter_invoice_extraction_event_order(fake_pdf):
+    pdf_path, rendered = fake_pdf
+    events = list(iter_invoice_extraction(pdf_path))
+
+    assert [(event.type, event.page) for event in events] == [
+        (PAGE_RENDERED, 1), (PAGE_OCR, 1), (HEADER_PARSED, 1), (LINE_ITEMS_FOUND, 1),
+        (PAGE_RENDERED, 2), (PAGE_OCR, 2), (LINE_ITEMS_FOUND, 2),
+        (PAGE_RENDERED, 3), (PAGE_OCR, 3), (TOTALS_PARSED, 3),
+        (EXTRACTION_COMPLETED, 3),
+    ]
+    assert rendered == [1, 2, 3]
+
+    data = events[-1].data
+    assert data['invoice_number'] == 'INV-9'
+    assert [item['description'] for item in data['items']] == ['Item A', 'Item B']
+    assert data['total'] == '27.50'
+
+
+def test_iter_invoice_extraction_page_rendered_payload_is_image(fake_pdf, tmp_path):
+    pdf_path, _ = fake_pdf
+    image_path = tmp_path / 'invoice.png'
+    Image.new('RGBA', (100, 50), 'white').save(image_path)
+
+    for path in (pdf_path, str(image_path)):
+        event = next(iter_invoice_extraction(path, lang='eng'))
+        assert event.type == PAGE_RENDERED
+        assert isinstance(event.data, Image.Image)
+        assert event.data.mode == 'RGB'
+
+
+def test_iter_invoice_extraction_applies_exif_orientation(tmp_path):
+    image_path = tmp_path / 'photo.jpg'
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Rotated 90 degrees clockwise
+    Image.new('RGB', (200, 100), 'white').save(image_path, exif=exif)
+
+    event = next(iter_invoice_extraction(str(image_path), lang='eng'))
+    assert event.data.size == (100, 200)
+
+
+def test_iter_invoice_extraction_stops_early(fake_pdf):
+    pdf_path, rendered = fake_pdf
+    for event in iter_invoice_extraction(pdf_path):
+        if event.type == HEADER_PARSED:
+            break
+
+    assert rendered == [1]
+
+
+def test_extract_invoice_data_only_processes_first_page(fake_pdf):
+    pdf_path, rendered = fake_pdf
+    data = extract_invoice_data(pdf_path)
+
+    assert rendered == [1]
+    assert data == parse_invoice_text(PDF_PAGES[0], 'eng')